@@ -1,8 +1,31 @@
 # data_loader.py
 import pandas as pd
 
+from utils import (
+    process_breed_data,
+    list_github_folders,
+    get_cleaned_breed_list,
+    create_breed_github_mapping
+)
+
 def load_breed_data():
     return pd.read_csv('data/breed_traits.csv')
 
 def load_trait_descriptions():
-    return pd.read_csv('data/trait_description.csv')
\ No newline at end of file
+    return pd.read_csv('data/trait_description.csv')
+
+def load_app_data():
+    d_breeds = load_breed_data()
+    t_descriptions = load_trait_descriptions()
+    sclr, s_dogs, ohe, num_traits = process_breed_data(d_breeds)
+    fldrs = list_github_folders()
+
+    # explain_top_breeds looks breeds up by cleaned name and ranks their numeric traits
+    d_breeds = d_breeds.set_index('Breed')
+    d_breeds.index = [str(breed).replace('\xa0', ' ').strip() for breed in d_breeds.index]
+    d_breeds = d_breeds[num_traits]
+
+    cleaned = get_cleaned_breed_list(d_breeds)
+    mpng = create_breed_github_mapping(cleaned, fldrs)
+
+    return d_breeds, t_descriptions, sclr, s_dogs, ohe, num_traits, cleaned, mpng
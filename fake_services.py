@@ -0,0 +1,236 @@
+# fake_services.py
+# Local stand-ins for the Gemini REST API and the GitHub dog image dataset,
+# used by loadtest.py so load runs never touch the real services.
+import json
+import random
+import threading
+import time
+import zlib
+from collections import deque
+from io import BytesIO
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+from PIL import Image
+
+from utils import DATASET_REPO, manual_mapping, normalize_for_matching
+
+COAT_LENGTHS = ["Short", "Medium", "Long"]
+
+
+class FaultProfile:
+    """Latency and error injection shared by both fake servers."""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._forced = deque()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def fail_next(self, count=1, after=0):
+        # Forces `count` requests to fail regardless of error_rate, once
+        # `after` further requests have gone through as usual
+        with self._lock:
+            self._forced.extend([False] * after + [True] * count)
+
+    def draw(self):
+        # Returns (delay in seconds, should_fail) for one request
+        with self._lock:
+            delay = self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+            fail = self._rng.random() < self.error_rate
+            if self._forced and self._forced.popleft():
+                fail = True
+        return max(delay, 0) / 1000, fail
+
+    def rng(self):
+        with self._lock:
+            return random.Random(self._rng.random())
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status, body, content_type="application/json"):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def inject_faults(self):
+        delay, fail = self.server.faults.draw()
+        if delay:
+            time.sleep(delay)
+        if fail:
+            self.send_body(500, {"error": {"code": 500, "message": "Injected failure", "status": "INTERNAL"}})
+        return fail
+
+
+class _GeminiHandler(_QuietHandler):
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        if not urlsplit(self.path).path.endswith(":generateContent"):
+            self.send_body(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+            return
+
+        if self.inject_faults():
+            return
+
+        text = self.server.reply_for(request.get("contents", []))
+        self.send_body(200, {
+            "candidates": [{
+                "content": {"role": "model", "parts": [{"text": text}]},
+                "finishReason": "STOP",
+                "index": 0
+            }]
+        })
+
+
+class FakeGeminiServer(ThreadingHTTPServer):
+    """Speaks just enough of the Gemini generateContent REST API for ChatSession.
+
+    Replies follow the shape of a PAWS interview: a consent message, then one
+    question per user answer, then the trait JSON when the user sends
+    `traits_trigger` (the script's last interview line). Caption prompts built
+    by the app get captions. `numeric_traits` and `coat_types` should come from
+    the loaded breed data so the JSON always matches what the recommender expects.
+
+    The phase is read from the content of each request rather than a turn
+    count, since ChatSession drops a turn from its history when the call fails.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, traits_trigger, numeric_traits, coat_types, faults=None, host="127.0.0.1", port=0):
+        super().__init__((host, port), _GeminiHandler)
+        self.traits_trigger = traits_trigger
+        self.numeric_traits = list(numeric_traits)
+        self.coat_types = list(coat_types)
+        self.faults = faults or FaultProfile()
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def reply_for(self, contents):
+        def text_of(c):
+            return "".join(part.get("text", "") for part in c.get("parts", []))
+
+        # The first user turn is the system prompt; the rest are the chat so far
+        user_texts = [text_of(c) for c in contents if c.get("role", "user") == "user"][1:]
+        model_texts = [text_of(c) for c in contents if c.get("role") == "model"]
+        last = user_texts[-1] if user_texts else ""
+
+        if last.startswith("Generate a short, playful social media caption"):
+            return "Sunshine, zoomies and one very good pup 🐶 #PAWS"
+        if last.startswith("Caption for looping video"):
+            return "Round and round with my favourite furry friend 🐾"
+        if last.strip() == self.traits_trigger.strip():
+            return self._traits_reply()
+        if any("```json" in t for t in model_texts):
+            return "Happy to help with anything else about your matches! 🐾"
+        if not model_texts:
+            return ("Before we start, just a quick note: I'm here to help match dog breeds based on "
+                    "personality and lifestyle traits. Ready to begin? 💛")
+        return f"Lovely, thank you! 🐶 Question {len(model_texts)}: how do you feel about this part of dog life?"
+
+    def _traits_reply(self):
+        rng = self.faults.rng()
+        traits = {t: rng.randint(1, 5) for t in self.numeric_traits}
+        traits["Coat Length"] = rng.choice(COAT_LENGTHS)
+        traits["Coat Type"] = rng.choice(self.coat_types)
+        return (
+            "Here is what I understood about your ideal dog preferences 🐶💛\n\n"
+            f"```json\n{json.dumps(traits, indent=2)}\n```"
+        )
+
+
+class _GitHubHandler(_QuietHandler):
+
+    def do_GET(self):
+        path = unquote(urlsplit(self.path).path)
+        contents_prefix = f"/repos/{DATASET_REPO}/contents"
+        raw_prefix = f"/{DATASET_REPO}/master/"
+
+        if self.inject_faults():
+            return
+
+        if path.rstrip("/") == contents_prefix:
+            self.send_body(200, [{"name": f, "type": "dir"} for f in self.server.folders])
+        elif path.startswith(contents_prefix + "/"):
+            folder = path[len(contents_prefix) + 1:]
+            if folder not in self.server.folders:
+                self.send_body(404, {"message": "Not Found"})
+                return
+            self.send_body(200, [
+                {
+                    "name": name,
+                    "type": "file",
+                    "download_url": f"{self.server.url}{raw_prefix}{folder}/{name}"
+                }
+                for name in self.server.image_names
+            ])
+        elif path.startswith(raw_prefix):
+            folder, _, name = path[len(raw_prefix):].rpartition("/")
+            if folder not in self.server.folders or name not in self.server.image_names:
+                self.send_body(404, b"404: Not Found", "text/plain")
+                return
+            self.send_body(200, self.server.image_bytes(folder, name), "image/jpeg")
+        else:
+            self.send_body(404, {"message": "Not Found"})
+
+
+class FakeGitHubServer(ThreadingHTTPServer):
+    """Serves the contents API and raw image files of the dog breed dataset.
+
+    Folder names are derived from the breed list the same way the app matches
+    them, so every breed resolves to a folder full of generated JPEGs.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, breed_names, images_per_breed=10, image_size=(300, 300), faults=None,
+                 host="127.0.0.1", port=0):
+        super().__init__((host, port), _GitHubHandler)
+        self.folders = {normalize_for_matching(b) for b in breed_names} | set(manual_mapping.values())
+        self.image_names = [f"Image_{i}.jpg" for i in range(1, images_per_breed + 1)]
+        self.image_size = image_size
+        self.faults = faults or FaultProfile()
+        self._images = {}
+        self._images_lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def image_bytes(self, folder, name):
+        key = (folder, name)
+        with self._images_lock:
+            if key not in self._images:
+                color = zlib.crc32(f"{folder}/{name}".encode("utf-8")).to_bytes(4, "big")[:3]
+                buf = BytesIO()
+                Image.new("RGB", self.image_size, tuple(color)).save(buf, format="JPEG")
+                self._images[key] = buf.getvalue()
+            return self._images[key]
+
+    def warm(self):
+        # Builds every image up front so the cache does not grow during a measured run
+        for folder in self.folders:
+            for name in self.image_names:
+                self.image_bytes(folder, name)
+
+
+def start_in_background(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
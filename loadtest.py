@@ -0,0 +1,518 @@
+# loadtest.py
+# Headless load test for the PAWS chat flow.
+#
+# Replays scripted interviews (consent -> questions -> trait JSON -> top 3
+# recommendation -> social post / video) for many concurrent simulated users,
+# with Gemini and the GitHub image dataset replaced by the local stand-ins in
+# fake_services.py. Example:
+#
+#   python loadtest.py --users 50 --concurrency 25 --gemini-latency-ms 1200
+#   python loadtest.py --users 50 --compare loadtest_results/run-20261019-101500.json
+import argparse
+import contextlib
+import gc
+import io
+import json
+import math
+import os
+import resource
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import google.generativeai as genai # type: ignore
+
+import logics
+from data_loader import load_app_data, load_breed_data
+from fake_services import FakeGeminiServer, FakeGitHubServer, FaultProfile, start_in_background
+
+DEFAULT_SCRIPT = {
+    "interview": [
+        "Hi PAWS!",
+        "Yes, let's begin!",
+        "I go running most mornings and love long weekend hikes.",
+        "Very cuddly please, it's a family dog.",
+        "We have two kids, 5 and 8.",
+        "We already have a friendly beagle at home.",
+        "We live in a house with a small garden.",
+        "Some training is fine, I've had dogs before.",
+        "A bit protective is nice but not aggressive.",
+        "Not too much barking, we have neighbours.",
+        "I'd rather not have fur everywhere.",
+        "No drool please!",
+        "Short coat, smooth if possible.",
+        "Brushing once a week is fine."
+    ],
+    "followups": [
+        "Can you write an Instagram post about the {breed}?",
+        "Now make a looping video of the {breed}!"
+    ]
+}
+
+# Per-turn buckets follow the conversation flow; STAGES are the helpers inside a turn
+FLOW_STAGES = ["consent", "question", "traits", "post", "video", "followup"]
+STAGES = ["session", "turn", "resent_attempt", "gemini", "recommend", "explain", "image", "video"]
+
+# Recorded by the harness itself rather than seen by the user, so these do
+# not make a session count as failed
+HARNESS_FINDINGS = {"video:path_collision"}
+
+_current = threading.local()
+_active_renders = Counter()
+_active_renders_lock = threading.Lock()
+
+
+class SessionRecorder:
+
+    def __init__(self):
+        self.timings = defaultdict(list)
+        self.flow_timings = defaultdict(list)
+        self.errors = Counter()
+        self.resends = 0
+
+    def stage_errors(self, stage):
+        return sum(n for kind, n in self.errors.items() if kind.startswith(f"{stage}:"))
+
+    def record(self, stage, seconds):
+        self.timings[stage].append(seconds)
+
+    def error(self, stage, kind):
+        self.errors[f"{stage}:{kind}"] += 1
+
+
+def flow_stage(prompt, index, interview_turns):
+    # Where a scripted user turn sits in the consent -> questions -> JSON -> post/video flow
+    if index == 0:
+        return "consent"
+    if index < interview_turns - 1:
+        return "question"
+    if index == interview_turns - 1:
+        return "traits"
+    return logics.detect_content_intent(prompt) or "followup"
+
+
+def _recorder():
+    return getattr(_current, "recorder", None)
+
+
+def _timed(stage, func, check=None):
+    # Wraps an app function so each call is timed against the calling session
+    def wrapper(*args, **kwargs):
+        rec = _recorder()
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if rec:
+                rec.record(stage, time.perf_counter() - start)
+                rec.error(stage, type(e).__name__)
+            raise
+        if rec:
+            rec.record(stage, time.perf_counter() - start)
+            if check and not check(result):
+                rec.error(stage, "failed")
+        return result
+    return wrapper
+
+
+def _timed_video(func):
+    # generate_breed_video writes <folder>.mp4 into the process-wide working
+    # directory, so sessions rendering the same breed at once share one file.
+    # cwd cannot differ per thread, so overlaps are reported instead.
+    timed = _timed("video", func, check=lambda p: isinstance(p, str))
+
+    def wrapper(breed, mapping, *args, **kwargs):
+        path = f"{mapping.get(breed)}.mp4"
+        with _active_renders_lock:
+            collided = _active_renders[path] > 0
+            _active_renders[path] += 1
+        rec = _recorder()
+        if collided and rec:
+            rec.error("video", "path_collision")
+        try:
+            return timed(breed, mapping, *args, **kwargs)
+        finally:
+            with _active_renders_lock:
+                _active_renders[path] -= 1
+    return wrapper
+
+
+def instrument_logics():
+    logics.recommend_dog_breeds = _timed("recommend", logics.recommend_dog_breeds)
+    logics.explain_top_breeds = _timed("explain", logics.explain_top_breeds)
+    logics.fetch_breed_image = _timed("image", logics.fetch_breed_image, check=lambda img: img is not None)
+    logics.generate_breed_video = _timed_video(logics.generate_breed_video)
+
+
+class TimedChatSession:
+    """Proxy around a Gemini ChatSession that times every send_message call."""
+
+    def __init__(self, chat_session):
+        self._chat = chat_session
+        self.send_message = _timed("gemini", chat_session.send_message)
+
+    def __getattr__(self, name):
+        return getattr(self._chat, name)
+
+
+def coat_types_from(ohe_cols):
+    # The one-hot columns drop the first coat type, which the recommender
+    # still accepts (all zeros), so the fake only picks from the encoded ones
+    return [c[len("Coat_Type_"):] for c in ohe_cols]
+
+
+def run_session(user_id, script, data, think_time=0.0, start_delay=0.0, max_resends=1):
+    rec = SessionRecorder()
+    _current.recorder = rec
+    state = {"messages": [], "top3_shown": False, "chat_session": None}
+    time.sleep(start_delay)
+    session_start = time.perf_counter()
+
+    try:
+        state["chat_session"] = TimedChatSession(logics.start_chat_session())
+
+        turns = list(script["interview"])
+        followups = list(script.get("followups", []))
+        interview_turns = len(turns)
+        breed = None
+        index = -1
+
+        while turns or followups:
+            if not turns:
+                if not state["top3_shown"]:
+                    rec.error("session", "no_recommendations")
+                    break
+                if breed is None:
+                    breed = next(
+                        (r["breed_name"] for m in state["messages"] for r in (m.get("recommendations") or [])),
+                        None
+                    )
+                turns.append(followups.pop(0).format(breed=breed))
+
+            prompt = turns.pop(0)
+            index += 1
+            stage = flow_stage(prompt, index, interview_turns)
+            state["messages"].append({"role": "user", "content": prompt, "recommendations": None, "video": None})
+
+            # A user whose message failed on Gemini's side sends it again. The
+            # turn is timed once, from the first send to the final answer; the
+            # attempts that were resent are also kept in their own bucket.
+            turn_start = time.perf_counter()
+            for attempt in range(max_resends + 1):
+                gemini_errors = rec.stage_errors("gemini")
+                attempt_start = time.perf_counter()
+                try:
+                    text, recommendations, video, state["top3_shown"] = logics.handle_chat_turn(
+                        prompt, state["chat_session"], state["top3_shown"], *data
+                    )
+                except Exception as e:
+                    rec.error("turn", type(e).__name__)
+                    text, recommendations, video = "", [], None
+                if rec.stage_errors("gemini") == gemini_errors or attempt == max_resends:
+                    break
+                rec.record("resent_attempt", time.perf_counter() - attempt_start)
+                rec.resends += 1
+            turn_seconds = time.perf_counter() - turn_start
+            rec.record("turn", turn_seconds)
+            rec.flow_timings[stage].append(turn_seconds)
+
+            state["messages"].append({
+                "role": "assistant",
+                "content": text,
+                "recommendations": recommendations,
+                "video": video
+            })
+
+            if think_time:
+                time.sleep(think_time)
+    except Exception as e:
+        rec.error("session", type(e).__name__)
+    finally:
+        rec.record("session", time.perf_counter() - session_start)
+        _current.recorder = None
+
+    return user_id, rec, state
+
+
+def measure_session_state(script, data, samples, max_resends=1):
+    # Runs sessions one at a time under tracemalloc and keeps each state alive
+    # while measuring, so only what a finished session retains is counted.
+    # Memory PIL or ffmpeg allocate outside the Python allocator is not traced.
+    sizes = []
+    for i in range(samples):
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        result = run_session(f"memory-{i}", script, data, max_resends=max_resends)
+        gc.collect()
+        sizes.append(tracemalloc.get_traced_memory()[0] - before)
+        tracemalloc.stop()
+        del result
+    return sizes
+
+
+def current_rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    # Nearest-rank percentile
+    idx = max(0, min(len(ordered), math.ceil(pct / 100 * len(ordered))) - 1)
+    return ordered[idx]
+
+
+def latency_stats(timings, names):
+    stats = {}
+    for name in names:
+        values = timings.get(name)
+        if not values:
+            continue
+        stats[name] = {
+            "count": len(values),
+            "mean_ms": 1000 * sum(values) / len(values),
+            "p50_ms": 1000 * percentile(values, 50),
+            "p95_ms": 1000 * percentile(values, 95),
+            "p99_ms": 1000 * percentile(values, 99),
+            "max_ms": 1000 * max(values)
+        }
+    return stats
+
+
+def summarize(results, wall_seconds, baseline_rss, retained_rss, state_sizes, config):
+    timings = defaultdict(list)
+    flow_timings = defaultdict(list)
+    errors = Counter()
+    for _, rec, _ in results:
+        for stage, values in rec.timings.items():
+            timings[stage].extend(values)
+        for stage, values in rec.flow_timings.items():
+            flow_timings[stage].extend(values)
+        errors.update(rec.errors)
+
+    n_sessions = len(results)
+    n_turns = len(timings.get("turn", []))
+    failed_sessions = sum(1 for _, rec, _ in results if set(rec.errors) - HARNESS_FINDINGS)
+    collided_sessions = sum(1 for _, rec, _ in results if rec.errors["video:path_collision"])
+    resends = sum(rec.resends for _, rec, _ in results)
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": config,
+        "wall_seconds": wall_seconds,
+        "sessions": n_sessions,
+        "sessions_with_errors": failed_sessions,
+        "sessions_with_video_collisions": collided_sessions,
+        "turns": n_turns,
+        "resends": resends,
+        "throughput": {
+            "turns_per_sec": n_turns / wall_seconds if wall_seconds else 0.0,
+            "sessions_per_sec": n_sessions / wall_seconds if wall_seconds else 0.0
+        },
+        "flow": latency_stats(flow_timings, FLOW_STAGES),
+        "stages": latency_stats(timings, STAGES),
+        "errors": dict(errors.most_common()),
+        "memory": {
+            "baseline_rss_mb": baseline_rss / 2**20,
+            "retained_rss_mb": retained_rss / 2**20,
+            "retained_per_session_kb": (retained_rss - baseline_rss) / 1024 / n_sessions if n_sessions else 0.0,
+            "peak_rss_mb": peak_rss_bytes() / 2**20,
+            "traced_state_kb_per_session": (
+                1 / 1024 * sorted(state_sizes)[len(state_sizes) // 2] if state_sizes else None
+            ),
+            "traced_state_samples": len(state_sizes)
+        }
+    }
+
+
+def print_report(report, previous=None):
+    def delta(new, old):
+        if old in (None, 0) or new is None:
+            return ""
+        return f" ({(new - old) / old * 100:+.1f}%)"
+
+    prev_tp = previous["throughput"] if previous else {}
+
+    print(f"\nPAWS load test  {report['timestamp']}")
+    print(f"sessions: {report['sessions']} ({report['sessions_with_errors']} with errors)  "
+          f"turns: {report['turns']} ({report['resends']} resends)  wall: {report['wall_seconds']:.1f}s")
+    if report["sessions_with_video_collisions"]:
+        print(f"video path collisions: {report['sessions_with_video_collisions']} sessions rendered "
+              f"to a <folder>.mp4 another session was writing (not counted as errors above)")
+    tp = report["throughput"]
+    print(f"throughput: {tp['turns_per_sec']:.2f} turns/s{delta(tp['turns_per_sec'], prev_tp.get('turns_per_sec'))}  "
+          f"{tp['sessions_per_sec']:.3f} sessions/s{delta(tp['sessions_per_sec'], prev_tp.get('sessions_per_sec'))}")
+
+    for section, title in (("flow", "flow stage"), ("stages", "helper")):
+        prev_stats = previous.get(section, {}) if previous else {}
+        print(f"\n{title:<12}{'count':>8}{'p50 ms':>12}{'p95 ms':>12}{'p99 ms':>12}{'max ms':>12}")
+        for stage, s in report[section].items():
+            line = f"{stage:<12}{s['count']:>8}{s['p50_ms']:>12.1f}{s['p95_ms']:>12.1f}{s['p99_ms']:>12.1f}{s['max_ms']:>12.1f}"
+            if stage in prev_stats:
+                line += f"   p95{delta(s['p95_ms'], prev_stats[stage]['p95_ms']) or ' (=)'}"
+            print(line)
+
+    mem = report["memory"]
+    print(f"\nmemory: baseline {mem['baseline_rss_mb']:.1f} MB, retained {mem['retained_rss_mb']:.1f} MB, "
+          f"peak {mem['peak_rss_mb']:.1f} MB, ~{mem['retained_per_session_kb']:.0f} KB RSS per session")
+    if mem["traced_state_kb_per_session"] is not None:
+        print(f"session state (tracemalloc, median of {mem['traced_state_samples']}): "
+              f"{mem['traced_state_kb_per_session']:.0f} KB")
+
+    print("\nerrors:" if report["errors"] else "\nerrors: none")
+    for kind, count in report["errors"].items():
+        prev_count = previous["errors"].get(kind, 0) if previous else None
+        suffix = f" (was {prev_count})" if previous else ""
+        print(f"  {kind:<30}{count:>6}{suffix}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Headless multi-session load test for the PAWS chatbot.")
+    parser.add_argument("--users", type=int, default=10, help="number of simulated users")
+    parser.add_argument("--concurrency", type=int, default=None, help="sessions running at once (default: --users)")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="seconds over which session starts are spread")
+    parser.add_argument("--think-time", type=float, default=0.0, help="seconds a user waits between turns")
+    parser.add_argument("--max-resends", type=int, default=1,
+                        help="times a user resends a message whose Gemini call failed")
+    parser.add_argument("--script", help="JSON file with 'interview' and 'followups' user turns")
+    parser.add_argument("--gemini-latency-ms", type=float, default=800)
+    parser.add_argument("--gemini-jitter-ms", type=float, default=200)
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0)
+    parser.add_argument("--github-latency-ms", type=float, default=80)
+    parser.add_argument("--github-jitter-ms", type=float, default=20)
+    parser.add_argument("--github-error-rate", type=float, default=0.0)
+    parser.add_argument("--images-per-breed", type=int, default=10)
+    parser.add_argument("--memory-samples", type=int, default=3,
+                        help="sessions run one by one under tracemalloc to size the session state")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="where to save the JSON results (default: loadtest_results/run-<time>.json)")
+    parser.add_argument("--compare", help="previous results JSON to compare against")
+    parser.add_argument("--keep-videos", action="store_true",
+                        help="keep the directory the rendered videos are written to")
+    parser.add_argument("--verbose", action="store_true", help="show the app's own print output")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    for name in ("script", "output", "compare"):
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    os.chdir(repo_dir)
+
+    script = DEFAULT_SCRIPT
+    if args.script:
+        with open(args.script) as f:
+            script = json.load(f)
+
+    breed_names = [str(b).replace('\xa0', ' ').strip() for b in load_breed_data()['Breed']]
+    github = start_in_background(FakeGitHubServer(
+        breed_names,
+        images_per_breed=args.images_per_breed,
+        faults=FaultProfile(args.github_latency_ms, args.github_jitter_ms, args.github_error_rate, seed=args.seed + 1)
+    ))
+    os.environ["PAWS_GITHUB_API_URL"] = github.url
+    os.environ["PAWS_GITHUB_RAW_URL"] = github.url
+
+    # Loaded with faults off so the shared folder listing is not what gets measured
+    github_error_rate, github.faults.error_rate = github.faults.error_rate, 0.0
+    data = load_app_data()
+    github.faults.error_rate = github_error_rate
+    numeric_traits, ohe_cols = data[5], data[4]
+
+    gemini = start_in_background(FakeGeminiServer(
+        traits_trigger=script["interview"][-1],
+        numeric_traits=numeric_traits,
+        coat_types=coat_types_from(ohe_cols),
+        faults=FaultProfile(args.gemini_latency_ms, args.gemini_jitter_ms, args.gemini_error_rate, seed=args.seed)
+    ))
+    genai.configure(api_key="load-test", transport="rest", client_options={"api_endpoint": gemini.url})
+    instrument_logics()
+
+    users = args.users
+    concurrency = args.concurrency or users
+    config = {k: v for k, v in vars(args).items() if k not in ("output", "compare", "verbose", "keep_videos")}
+    config["concurrency"] = concurrency
+    config["interview_turns"] = len(script["interview"])
+    config["followup_turns"] = len(script.get("followups", []))
+
+    # generate_breed_video writes <folder>.mp4 into the working directory
+    workdir = tempfile.mkdtemp(prefix="paws-loadtest-")
+    os.chdir(workdir)
+
+    print(f"Running {users} sessions ({concurrency} concurrent) against "
+          f"fake Gemini {gemini.url} and fake GitHub {github.url} ...")
+    try:
+        output_sink = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        with output_sink:
+            # Fill the fake image cache and pay one-off import and ffmpeg start-up
+            # costs before the baseline, so they are not charged to the sessions
+            github.warm()
+            gemini_error_rate, gemini.faults.error_rate = gemini.faults.error_rate, 0.0
+            run_session("warm-up", script, data)
+            gemini.faults.error_rate = gemini_error_rate
+            gc.collect()
+            baseline_rss = current_rss_bytes()
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                futures = [
+                    pool.submit(run_session, i, script, data, args.think_time,
+                                args.ramp_up * i / concurrency if i < concurrency else 0.0, args.max_resends)
+                    for i in range(users)
+                ]
+                results = [f.result() for f in futures]
+            wall_seconds = time.perf_counter() - start
+
+            # Session states are still referenced by results, so this is what they retain
+            gc.collect()
+            retained_rss = current_rss_bytes()
+
+            state_sizes = measure_session_state(script, data, args.memory_samples, args.max_resends)
+    finally:
+        os.chdir(repo_dir)
+        if not args.keep_videos:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = summarize(results, wall_seconds, baseline_rss, retained_rss, state_sizes, config)
+    if args.keep_videos:
+        report["video_workdir"] = workdir
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+    print_report(report, previous)
+
+    output = args.output or os.path.join(
+        "loadtest_results", f"run-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+    gemini.shutdown()
+    github.shutdown()
+
+
+if __name__ == "__main__":
+    main()
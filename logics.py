@@ -8,6 +8,10 @@ import numpy as np
 from moviepy.editor import ImageSequenceClip # type: ignore
 from urllib.parse import quote
 import re
+import json
+import google.generativeai as genai # type: ignore
+
+from utils import DATASET_REPO, github_api_url, github_raw_url, system_prompt
 
 def recommend_dog_breeds(raw_user_input,scaled_dogs,numeric_traits,scaler,ohe_cols,top_n=3):
     # Prepare numeric input
@@ -78,7 +82,7 @@ def explain_top_breeds(ranked_breeds, dog_breeds, trait_df):
     return results
 
 def fetch_breed_image(breed, mapping=None, image_name="Image_5.jpg"):
-    base_url = "https://raw.githubusercontent.com/maartenvandenbroeck/Dog-Breeds-Dataset/master"
+    base_url = f"{github_raw_url()}/{DATASET_REPO}/master"
 
     if breed in mapping.keys():
       folder = mapping[breed]
@@ -106,19 +110,23 @@ def generate_breed_video(breed, mapping, max_images=10, size=(300, 300), sec_per
     
     if breed not in mapping:
         print(f"⚠️ Breed '{breed}' not found in mapping!")
-        return None, None
+        return None
 
     folder = mapping[breed]
 
-    repo_url = "https://api.github.com/repos/maartenvandenbroeck/Dog-Breeds-Dataset/contents"
+    repo_url = f"{github_api_url()}/repos/{DATASET_REPO}/contents"
     breed_url = f"{repo_url}/{folder}"
 
-    resp = requests.get(breed_url)
-    if resp.status_code != 200:
-        print("⚠️ GitHub folder fetch failed!")
-        return None, None
+    try:
+        resp = requests.get(breed_url)
+        if resp.status_code != 200:
+            print("⚠️ GitHub folder fetch failed!")
+            return None
 
-    files = resp.json()
+        files = resp.json()
+    except Exception as e:
+        print(f"⚠️ GitHub folder fetch failed for {breed}: {e}")
+        return None
 
     image_urls = [
         f["download_url"]
@@ -130,12 +138,21 @@ def generate_breed_video(breed, mapping, max_images=10, size=(300, 300), sec_per
 
     if len(image_urls) == 0:
         print("⚠️ No images found for breed!")
-        return None, None
+        return None
 
     pil_images = []
     for url in image_urls:
-        r = requests.get(url)
-        img = Image.open(BytesIO(r.content)).convert("RGB")
+        try:
+            r = requests.get(url)
+            if r.status_code != 200:
+                print(f"⚠️ Image download failed for {breed}: {url}")
+                return None
+
+            img = Image.open(BytesIO(r.content)).convert("RGB")
+        except Exception as e:
+            print(f"⚠️ Error fetching image for {breed}: {e}")
+            return None
+
         img = img.resize(size)
         pil_images.append(img)
 
@@ -172,4 +189,94 @@ def extract_breed_from_text(user_text, cleaned_breed_list):
         if breed.lower() in text:
             return breed
 
-    return None
\ No newline at end of file
+    return None
+
+def start_chat_session(model_name="gemini-2.5-flash"):
+    model = genai.GenerativeModel(model_name)
+    return model.start_chat(history=[{"role": "user", "parts": [system_prompt]}])
+
+def handle_chat_turn(prompt, chat_session, top3_shown, dog_breeds, trait_descriptions,
+                     scaler, scaled_dogs, ohe_cols, numeric_traits, cleaned_breed_list, mapping):
+    # Runs one user turn without touching Streamlit so it can also be driven headless
+    intent = detect_content_intent(prompt)
+
+    final_text_content = ""
+    final_recommendations = []
+    final_video = None
+
+    if top3_shown and intent in ["post", "video"]:
+        breed = extract_breed_from_text(prompt, cleaned_breed_list)
+
+        if not breed:
+            resp = chat_session.send_message(prompt)
+            final_text_content = resp.text
+        else:
+            if intent == "post":
+                post_prompt = f"Generate a short, playful social media caption for {breed}. Theme: {prompt}. Max 2 sentences."
+                post_response = chat_session.send_message(post_prompt)
+                final_text_content = f"**PAWS (Social Media Post):**\n\n{post_response.text.strip()}"
+
+                img = fetch_breed_image(breed, mapping=mapping)
+                if img:
+                    final_recommendations.append({
+                        "breed_name": breed,
+                        "description": "",
+                        "image": img
+                    })
+
+            elif intent == "video":
+                video_prompt = f"Caption for looping video of {breed}. Theme: {prompt}."
+                video_caption = chat_session.send_message(video_prompt)
+                final_text_content = f"**PAWS (Video Caption):**\n\n{video_caption.text.strip()}"
+
+                mp4_path = generate_breed_video(breed, mapping)
+                if mp4_path:
+                    final_video = mp4_path
+
+    else:
+        try:
+            response = chat_session.send_message(prompt)
+            full_response_text = response.text
+
+            json_match = re.search(r'```json\n({.*?})\n```', full_response_text, re.DOTALL)
+            json_pattern = r'```json\n{.*?}\n```'
+
+            cleaned_text = re.sub(json_pattern, '', full_response_text, flags=re.DOTALL).strip()
+            final_text_content = cleaned_text
+
+            if json_match:
+                parsed = json.loads(json_match.group(1))
+
+                if 'Coat Length' in parsed and 'Coat Type' in parsed:
+                    ranked_df = recommend_dog_breeds(parsed, scaled_dogs, numeric_traits, scaler, ohe_cols)
+
+                    ranked_list_for_explanation = []
+                    for idx, row in ranked_df.iterrows():
+                        raw_name = row['Breed']
+                        clean_name = str(raw_name).replace('\xa0', ' ').strip()
+                        ranked_list_for_explanation.append((clean_name, row['Similarity']))
+
+                    final_results_data = explain_top_breeds(ranked_list_for_explanation, dog_breeds, trait_descriptions)
+                    if not final_text_content:
+                        final_text_content = "Great news! Here are our top 3 dog breed recommendations, handpicked just for you: 🐾\n\n"
+
+                    for r in final_results_data:
+                        raw_name = r['Breed']
+                        b_name = str(raw_name).replace('\xa0', ' ').strip()
+
+                        img = fetch_breed_image(b_name, mapping=mapping)
+
+                        final_recommendations.append({
+                            "breed_name": b_name,
+                            "description": r['Explanation'],
+                            "image": img
+                        })
+
+                    top3_shown = True
+
+        except Exception as e:
+            print(f"DEBUG ERROR: {e}")
+            if not final_text_content:
+                final_text_content = "I'm thinking..? 🐾"
+
+    return final_text_content, final_recommendations, final_video, top3_shown
@@ -0,0 +1,165 @@
+# test_loadtest.py
+# Smoke tests for the headless chat turn, the fake services and the load test helpers.
+import os
+
+import pytest
+
+pytest.importorskip("PIL")
+pytest.importorskip("pandas")
+pytest.importorskip("sklearn")
+pytest.importorskip("moviepy.editor")
+pytest.importorskip("google.generativeai")
+
+import google.generativeai as genai # type: ignore
+import requests
+
+import loadtest
+import logics
+from data_loader import load_app_data, load_breed_data
+from fake_services import FakeGeminiServer, FakeGitHubServer, start_in_background
+from utils import DATASET_REPO
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture(scope="module")
+def fakes(tmp_path_factory):
+    cwd = os.getcwd()
+    os.chdir(REPO_DIR)
+    originals = {
+        name: getattr(logics, name)
+        for name in ("recommend_dog_breeds", "explain_top_breeds", "fetch_breed_image", "generate_breed_video")
+    }
+
+    breed_names = [str(b).replace('\xa0', ' ').strip() for b in load_breed_data()['Breed']]
+    github = start_in_background(FakeGitHubServer(breed_names, images_per_breed=3))
+    os.environ["PAWS_GITHUB_API_URL"] = github.url
+    os.environ["PAWS_GITHUB_RAW_URL"] = github.url
+    data = load_app_data()
+
+    gemini = start_in_background(FakeGeminiServer(
+        traits_trigger=loadtest.DEFAULT_SCRIPT["interview"][-1],
+        numeric_traits=data[5],
+        coat_types=loadtest.coat_types_from(data[4])
+    ))
+    genai.configure(api_key="test", transport="rest", client_options={"api_endpoint": gemini.url})
+    loadtest.instrument_logics()
+
+    # Rendered videos land in the working directory
+    os.chdir(tmp_path_factory.mktemp("videos"))
+    yield gemini, github, data
+
+    os.chdir(cwd)
+    for name, func in originals.items():
+        setattr(logics, name, func)
+    for var in ("PAWS_GITHUB_API_URL", "PAWS_GITHUB_RAW_URL"):
+        os.environ.pop(var, None)
+    gemini.shutdown()
+    github.shutdown()
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert loadtest.percentile(values, 50) == 50
+    assert loadtest.percentile(values, 95) == 95
+    assert loadtest.percentile(values, 99) == 99
+    assert loadtest.percentile([7], 99) == 7
+    assert loadtest.percentile([], 50) is None
+
+
+def test_flow_stage_tags():
+    assert loadtest.flow_stage("Hi", 0, 4) == "consent"
+    assert loadtest.flow_stage("Active", 1, 4) == "question"
+    assert loadtest.flow_stage("Short coat", 3, 4) == "traits"
+    assert loadtest.flow_stage("Write an Instagram post", 4, 4) == "post"
+    assert loadtest.flow_stage("Make a looping video", 5, 4) == "video"
+    assert loadtest.flow_stage("Tell me more", 6, 4) == "followup"
+
+
+def test_fake_gemini_reads_phase_from_content():
+    server = FakeGeminiServer("Short coat please", numeric_traits=["Energy Level"], coat_types=["Smooth"])
+    try:
+        def user(text):
+            return {"role": "user", "parts": [{"text": text}]}
+
+        def model(text):
+            return {"role": "model", "parts": [{"text": text}]}
+
+        system = user("system prompt")
+        assert "Ready to begin" in server.reply_for([system, user("Hi")])
+        # A failed call leaves its user turn out of the history, so the phase must not depend on counts
+        assert "Question" in server.reply_for([system, user("Hi"), model("Ready?"), user("Yes")])
+        assert "```json" in server.reply_for([system, user("Hi"), model("Ready?"), user("Short coat please")])
+        assert server.reply_for([system, user("Caption for looping video of Pugs.")]).startswith("Round")
+    finally:
+        server.server_close()
+
+
+def test_fake_github_routes_and_faults(fakes):
+    _, github, _ = fakes
+    folder = sorted(github.folders)[0]
+    base = f"{github.url}/repos/{DATASET_REPO}/contents"
+
+    listing = requests.get(base).json()
+    assert {"name": folder, "type": "dir"} in listing
+
+    files = requests.get(f"{base}/{folder}").json()
+    assert [f["name"] for f in files] == github.image_names
+    image = requests.get(files[0]["download_url"])
+    assert image.status_code == 200 and image.headers["Content-Type"] == "image/jpeg"
+
+    assert requests.get(f"{base}/no such breed").status_code == 404
+    github.faults.fail_next()
+    assert requests.get(base).status_code == 500
+    assert requests.get(base).status_code == 200
+
+
+def test_session_reaches_recommendations_post_and_video(fakes):
+    _, _, data = fakes
+    _, rec, state = loadtest.run_session(0, loadtest.DEFAULT_SCRIPT, data, max_resends=0)
+
+    assert not rec.errors
+    assert state["top3_shown"]
+    replies = [m for m in state["messages"] if m["role"] == "assistant"]
+    recommendations = next(m["recommendations"] for m in replies if m["recommendations"])
+    assert len(recommendations) == 3 and all(r["image"] is not None for r in recommendations)
+    assert replies[-2]["content"].startswith("**PAWS (Social Media Post):**")
+    assert replies[-2]["recommendations"][0]["image"] is not None
+    assert isinstance(replies[-1]["video"], str) and os.path.exists(replies[-1]["video"])
+    assert set(rec.flow_timings) == {"consent", "question", "traits", "post", "video"}
+
+
+def test_gemini_error_does_not_derail_the_interview(fakes):
+    gemini, _, data = fakes
+
+    gemini.faults.fail_next()
+    _, rec, state = loadtest.run_session(1, loadtest.DEFAULT_SCRIPT, data, max_resends=0)
+    assert rec.stage_errors("gemini") == 1
+    assert "session:no_recommendations" not in rec.errors
+    assert state["top3_shown"] and rec.timings["video"]
+
+    gemini.faults.fail_next()
+    _, rec, state = loadtest.run_session(2, loadtest.DEFAULT_SCRIPT, data, max_resends=1)
+    assert rec.resends == 1
+    assert len(rec.timings["resent_attempt"]) == 1
+    # The resent message is still one turn
+    script_turns = len(loadtest.DEFAULT_SCRIPT["interview"]) + len(loadtest.DEFAULT_SCRIPT["followups"])
+    assert len(rec.timings["turn"]) == script_turns
+    assert state["top3_shown"]
+
+
+def test_failed_image_download_fails_the_video_without_crashing_the_turn(fakes):
+    _, github, data = fakes
+    script = {
+        "interview": [loadtest.DEFAULT_SCRIPT["interview"][-1]],
+        "followups": ["Now make a looping video of the {breed}!"]
+    }
+
+    # Three recommendation images and the folder listing go through, then the first video frame fails
+    github.faults.fail_next(after=4)
+    _, rec, state = loadtest.run_session(3, script, data, max_resends=0)
+
+    assert state["top3_shown"]
+    assert state["messages"][-1]["video"] is None
+    assert rec.errors["video:failed"] == 1
+    assert not any(kind.startswith("turn:") for kind in rec.errors)
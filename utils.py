@@ -1,4 +1,5 @@
 # utils.py
+import os
 import requests
 import pandas as pd
 import re
@@ -26,8 +27,17 @@ def process_breed_data(dog_breeds):
 
     return scaler, scaled_dogs, ohe_cols, numeric_traits
 
+DATASET_REPO = "maartenvandenbroeck/Dog-Breeds-Dataset"
+
+def github_api_url():
+    # Overridable so the load test can point the app at a local stand-in server
+    return os.environ.get("PAWS_GITHUB_API_URL", "https://api.github.com").rstrip("/")
+
+def github_raw_url():
+    return os.environ.get("PAWS_GITHUB_RAW_URL", "https://raw.githubusercontent.com").rstrip("/")
+
 def list_github_folders():
-    repo_url = "https://api.github.com/repos/maartenvandenbroeck/Dog-Breeds-Dataset/contents"
+    repo_url = f"{github_api_url()}/repos/{DATASET_REPO}/contents"
 
     response = requests.get(repo_url)
 